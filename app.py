@@ -1,33 +1,707 @@
 import streamlit as st
-import openai
-import chromadb
-import pandas as pd
+import numpy as np
 from datetime import datetime
+from collections import Counter, OrderedDict
+import atexit
+import functools
 import json
+import os
+import sqlite3
 import hashlib
+import threading
+import time
 from typing import List, Dict, Any
 
+# Optional fast-path dependencies: sentence-transformers for local embeddings,
+# FAISS for brute-force inner-product search, sqlite-vec for persistent
+# in-process KNN. Whatever is missing degrades gracefully down to ChromaDB.
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    import sqlite_vec
+    SQLITE_VEC_AVAILABLE = True
+except ImportError:
+    SQLITE_VEC_AVAILABLE = False
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # PersonalKnowledgeRAG - AI-Powered Personalized Knowledge Assistant
 # Combines trending LinkedIn topic (AI-powered personalization) with RAG applications
 # Solves knowledge base integration and document processing challenges
 
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+
+# Below this corpus size a dense matrix-vector scoring pass beats any index;
+# the whole matrix fits in cache and the work is one BLAS/Numba sweep.
+SMALL_CORPUS_THRESHOLD = 1000
+
+# Above this corpus size the float32 matrix (~384*4 bytes/row) no longer fits
+# in a typical CPU L3, so the scoring sweep turns DRAM-bound; once a GPU is
+# present, HBM bandwidth makes the same matvec an order of magnitude faster.
+GPU_OFFLOAD_THRESHOLD = 20000
+
+# Flush the interaction log to disk every this many events
+HISTORY_FLUSH_EVERY = 32
+
+# HNSW parameters for the ChromaDB fallback. The defaults are tuned for
+# recall at large k; this app asks for n_results=3, so a small search_ef
+# (~4x n_results) terminates the graph walk after far fewer vector loads.
+# Space is inner-product: Chroma's default MiniLM embedding function emits
+# unit vectors, so IP equals cosine without the per-comparison norm work.
+CHROMA_HNSW_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:search_ef": 16,
+    "hnsw:construction_ef": 100,
+    "hnsw:M": 16
+}
+
+# Prompt pieces are module-level constants so generate_personalized_response
+# does one C-level format pass per call instead of rebuilding dict literals
+# and a multi-line f-string every time.
+# Expertise-level query wrappers: (prefix, suffix) pairs looked up by level
+# so query enhancement is one concatenation instead of branchy f-strings.
+QUERY_WRAP = {
+    'beginner': ('basic introduction ', ' simple explanation'),
+    'intermediate': ('', ''),
+    'expert': ('advanced technical ', ' detailed analysis')
+}
+
+STYLE_INSTRUCTIONS = {
+    'professional': "Provide a professional, structured response",
+    'casual': "Use a friendly, conversational tone",
+    'technical': "Focus on technical details and implementation",
+    'creative': "Use creative examples and analogies"
+}
+
+LEVEL_INSTRUCTIONS = {
+    'beginner': "Explain concepts simply with basic examples",
+    'intermediate': "Provide balanced detail with practical examples",
+    'expert': "Include advanced concepts and technical depth"
+}
+
+PROMPT_TEMPLATE = """
+Based on the following context, answer the user's question.
+
+Context:
+{context}
+
+User Question: {query}
+
+Instructions:
+- {style}
+- {level}
+- Make the response personally relevant and actionable
+
+Response:
+"""
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(matrix, query):
+        n = matrix.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for i in numba.prange(n):
+            acc = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                acc += matrix[i, j] * query[j]
+            scores[i] = acc
+        return scores
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores_int8(matrix, query):
+        n = matrix.shape[0]
+        scores = np.empty(n, dtype=np.int32)
+        for i in numba.prange(n):
+            acc = np.int32(0)
+            for j in range(matrix.shape[1]):
+                acc += np.int32(matrix[i, j]) * np.int32(query[j])
+            scores[i] = acc
+        return scores
+
+
+def serialize_interaction(interaction: Dict[str, Any]) -> bytes:
+    """Serialize one interaction as a JSONL line.
+
+    orjson emits bytes directly and serializes datetime natively in C;
+    the stdlib fallback pays the isoformat + str-encode detour.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(interaction) + b"\n"
+    record = dict(interaction, timestamp=interaction['timestamp'].isoformat())
+    return (json.dumps(record) + "\n").encode()
+
+
+def content_id(content: str) -> str:
+    """Content-addressed document id.
+
+    BLAKE3 when available (SIMD tree hash, multi-GB/s on long documents),
+    otherwise the original MD5 so existing persisted ids keep matching.
+    """
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(content.encode()).hexdigest(length=16)
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normalize rows to unit length so inner product equals cosine"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-vector int8 quantization; returns (int8 rows, scales)"""
+    scales = 127.0 / np.maximum(np.abs(vectors).max(axis=-1), 1e-12)
+    quantized = np.round(vectors * scales[..., None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _topk(scores: np.ndarray, k: int):
+    """Partial top-k via argpartition (no full sort), descending"""
+    k = min(k, scores.shape[0])
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def cosine_topk(matrix, query, k):
+    """Top-k by cosine similarity over a dense float32 matrix.
+
+    Rows are normalized at insert time, so a plain dot product is the cosine.
+    Uses the parallel Numba kernel when available, otherwise a BLAS matvec.
+    """
+    if NUMBA_AVAILABLE:
+        scores = _dot_scores(matrix, query)
+    else:
+        scores = matrix @ query
+    top = _topk(scores, k)
+    return top, scores[top]
+
+
+def cosine_topk_int8(matrix_int8, scales, query, k):
+    """Top-k over int8-quantized rows: quarter the bytes streamed per query.
+
+    Scores accumulate in int32 and are rescaled by the per-row and query
+    scales to approximate the float cosine.
+    """
+    query_int8, query_scale = quantize_int8(query)
+    if NUMBA_AVAILABLE:
+        int_scores = _dot_scores_int8(matrix_int8, query_int8)
+    else:
+        int_scores = matrix_int8.astype(np.int32) @ query_int8.astype(np.int32)
+    scores = int_scores.astype(np.float32) / (scales * query_scale)
+    top = _topk(scores, k)
+    return top, scores[top]
+
+
+@functools.cache
+def _chromadb():
+    """Import chromadb only when the fallback path actually needs it.
+
+    The native extension adds noticeable cold-start time, and the default
+    FAISS/sqlite-vec paths never touch it.
+    """
+    import chromadb
+    return chromadb
+
+
+def encoding_device() -> str:
+    """Pick the encode device once: GPU when torch sees one, else CPU"""
+    if TORCH_AVAILABLE and torch.cuda.is_available():
+        return 'cuda'
+    return 'cpu'
+
+
+class BatchedQueryEncoder:
+    """Micro-batches concurrent query encodes into one forward pass.
+
+    Streamlit serves each session on its own thread, so simultaneous
+    questions would otherwise each run a batch-of-1 forward pass. Callers
+    that arrive within a short window are encoded together; the forward
+    pass is GEMM-bound, so per-query latency drops with batch depth.
+    """
+
+    def __init__(self, model: "SentenceTransformer", window_ms: float = 5.0):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.device = encoding_device()
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def encode(self, text: str) -> np.ndarray:
+        entry = {'text': text, 'done': threading.Event(), 'result': None}
+        with self._lock:
+            self._pending.append(entry)
+            is_leader = len(self._pending) == 1
+        if is_leader:
+            # First caller in the window flushes the batch for everyone
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            embeddings = self.model.encode(
+                [e['text'] for e in batch],
+                batch_size=len(batch),
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                device=self.device,
+            ).astype(np.float32)
+            for e, embedding in zip(batch, embeddings):
+                e['result'] = embedding
+                e['done'].set()
+        entry['done'].wait()
+        return entry['result']
+
+
+class FAISSVectorStore:
+    """In-process vector store: flat inner-product index over normalized embeddings.
+
+    For small corpora a brute-force IndexFlatIP is a single BLAS matrix-vector
+    product per query, which beats the ChromaDB client round-trip and avoids
+    re-embedding documents on every call.
+    """
+
+    def __init__(self, persist_path: str = "embeddings.npz", quantize: bool = True,
+                 model: "SentenceTransformer" = None):
+        self.model = model if model is not None else SentenceTransformer(EMBEDDING_MODEL_NAME)
+        self.query_encoder = BatchedQueryEncoder(self.model)
+        self.index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        # SoA layout: the hot path touches only the contiguous float32 arena;
+        # text and metadata are cold parallel lists materialized after top-k.
+        # The arena doubles on overflow so appends are amortized O(1).
+        self._arena = np.empty((16, EMBEDDING_DIM), dtype=np.float32)
+        # int8 shadow of the arena for the bandwidth-bound scoring pass
+        self._arena_int8 = np.empty((16, EMBEDDING_DIM), dtype=np.int8)
+        self._scales = np.empty(16, dtype=np.float32)
+        self.quantize = quantize
+        self.count = 0
+        # GPU copy of the matrix for very large corpora; shipped lazily on
+        # first qualifying query and refreshed when the corpus grows
+        self._gpu_matrix = None
+        self._gpu_count = 0
+        self.docs = []  # parallel to arena rows
+        self.metas = []  # parallel to arena rows
+        self.doc_ids = []  # parallel to arena rows; ids are content hashes
+        self._id_set = set()
+        self.persist_path = persist_path
+        self._load()
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """View of the filled portion of the arena"""
+        return self._arena[:self.count]
+
+    def _reserve(self, n: int):
+        """Grow the arena (capacity doubling) to fit n more rows"""
+        needed = self.count + n
+        if needed <= self._arena.shape[0]:
+            return
+        capacity = self._arena.shape[0]
+        while capacity < needed:
+            capacity *= 2
+        arena = np.empty((capacity, EMBEDDING_DIM), dtype=np.float32)
+        arena[:self.count] = self._arena[:self.count]
+        self._arena = arena
+        arena_int8 = np.empty((capacity, EMBEDDING_DIM), dtype=np.int8)
+        arena_int8[:self.count] = self._arena_int8[:self.count]
+        self._arena_int8 = arena_int8
+        scales = np.empty(capacity, dtype=np.float32)
+        scales[:self.count] = self._scales[:self.count]
+        self._scales = scales
+
+    def _append_rows(self, embeddings: np.ndarray):
+        """Append float rows to the arena and their int8 shadow"""
+        n = embeddings.shape[0]
+        self._reserve(n)
+        self._arena[self.count:self.count + n] = embeddings
+        quantized, scales = quantize_int8(embeddings)
+        self._arena_int8[self.count:self.count + n] = quantized
+        self._scales[self.count:self.count + n] = scales
+        self.count += n
+
+    def _load(self):
+        """Warm start: load persisted embeddings instead of re-encoding"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        data = np.load(self.persist_path, allow_pickle=False)
+        embeddings = np.ascontiguousarray(data['embeddings'], dtype=np.float32)
+        # Re-normalize defensively: every scoring path (FAISS IP, the dense
+        # kernels, int8 scales) assumes unit rows normalized once at insert
+        embeddings = l2_normalize(embeddings).astype(np.float32)
+        self._append_rows(embeddings)
+        self.index.add(embeddings)
+        for doc_id, content, metadata in zip(data['ids'], data['documents'], data['metadatas']):
+            self.docs.append(str(content))
+            self.metas.append(json.loads(str(metadata)))
+            self.doc_ids.append(str(doc_id))
+            self._id_set.add(str(doc_id))
+
+    def _save(self):
+        """Persist embeddings and payloads so reruns skip the embedding model"""
+        if not self.persist_path:
+            return
+        np.savez(
+            self.persist_path,
+            embeddings=self.embeddings,
+            ids=np.array(self.doc_ids),
+            documents=np.array(self.docs),
+            metadatas=np.array([json.dumps(meta) for meta in self.metas]),
+        )
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a normalized float32 vector (inner product == cosine)"""
+        return self.query_encoder.encode(text)
+
+    def has(self, doc_id: str) -> bool:
+        return doc_id in self._id_set
+
+    def add(self, doc_id: str, content: str, metadata: Dict[str, Any]):
+        self.add_batch([doc_id], [content], [metadata])
+
+    def add_batch(self, doc_ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add documents in one batched encode (GEMM) instead of N single passes"""
+        new = [
+            (doc_id, content, metadata)
+            for doc_id, content, metadata in zip(doc_ids, contents, metadatas)
+            if not self.has(doc_id)
+        ]
+        if not new:
+            return
+        embeddings = self.model.encode(
+            [content for _, content, _ in new],
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            device=self.query_encoder.device,
+        ).astype(np.float32)
+        self._append_rows(embeddings)
+        self.index.add(embeddings)
+        for doc_id, content, metadata in new:
+            self.docs.append(content)
+            self.metas.append(metadata)
+            self.doc_ids.append(doc_id)
+            self._id_set.add(doc_id)
+        self._save()
+
+    def _gpu_topk(self, query_embedding: np.ndarray, k: int):
+        """Dense top-k on the GPU: one matvec against the resident matrix"""
+        if self._gpu_matrix is None or self._gpu_count != self.count:
+            matrix = np.ascontiguousarray(self.embeddings)
+            self._gpu_matrix = torch.from_numpy(matrix).to('cuda', non_blocking=True)
+            self._gpu_count = self.count
+        query = torch.from_numpy(query_embedding).to('cuda')
+        scores = self._gpu_matrix @ query
+        top = torch.topk(scores, k)
+        return top.indices.cpu().numpy(), top.values.cpu().numpy()
+
+    def search(self, query: str, n_results: int):
+        """Return results in the same shape as a ChromaDB query response"""
+        return self.search_embedding(self.embed(query), n_results)
+
+    def search_embedding(self, query_embedding: np.ndarray, n_results: int):
+        """Search with an already-computed query embedding"""
+        n_results = min(n_results, self.count)
+        if n_results == 0:
+            return {'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        if (self.count >= GPU_OFFLOAD_THRESHOLD
+                and TORCH_AVAILABLE and torch.cuda.is_available()):
+            # DRAM-bound on CPU at this size; score from GPU memory instead
+            top, top_scores = self._gpu_topk(query_embedding, n_results)
+        elif self.count < SMALL_CORPUS_THRESHOLD:
+            # Tiny corpus: one dense scoring sweep, no index dispatch
+            if self.quantize:
+                top, top_scores = cosine_topk_int8(
+                    self._arena_int8[:self.count], self._scales[:self.count],
+                    query_embedding, n_results
+                )
+            else:
+                top, top_scores = cosine_topk(self.embeddings, query_embedding, n_results)
+        else:
+            scores, indices = self.index.search(query_embedding[None, :], n_results)
+            top, top_scores = indices[0], scores[0]
+        # Payloads are only materialized here, after top-k is chosen
+        docs = [self.docs[i] for i in top]
+        metas = [self.metas[i] for i in top]
+        # ChromaDB reports distances (smaller = closer); convert from similarity
+        distances = [1.0 - float(s) for s in top_scores]
+        return {'documents': [docs], 'metadatas': [metas], 'distances': [distances]}
+
+
+class SqliteVecStore:
+    """Persistent in-process vector store backed by sqlite-vec's vec0 table.
+
+    KNN over a vec0 virtual table is a single SQL statement with no
+    server/client hop, which is plenty for small-to-medium corpora and gives
+    durability for free via the SQLite file.
+    """
+
+    def __init__(self, db_path: str = "knowledge_base.db", model: "SentenceTransformer" = None):
+        self.model = model if model is not None else SentenceTransformer(EMBEDDING_MODEL_NAME)
+        self.query_encoder = BatchedQueryEncoder(self.model)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.enable_load_extension(True)
+        sqlite_vec.load(self.conn)
+        self.conn.enable_load_extension(False)
+        self.conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS vec_docs USING vec0(embedding FLOAT[{EMBEDDING_DIM}])"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs (rowid INTEGER PRIMARY KEY, doc_id TEXT UNIQUE, content TEXT, metadata TEXT)"
+        )
+        self.conn.commit()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a normalized float32 vector (inner product == cosine)"""
+        return self.query_encoder.encode(text)
+
+    def has(self, doc_id: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row is not None
+
+    def add(self, doc_id: str, content: str, metadata: Dict[str, Any]):
+        self.add_batch([doc_id], [content], [metadata])
+
+    def add_batch(self, doc_ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add documents with one batched encode and a single transaction"""
+        new = [
+            (doc_id, content, metadata)
+            for doc_id, content, metadata in zip(doc_ids, contents, metadatas)
+            if not self.has(doc_id)
+        ]
+        if not new:
+            return
+        embeddings = self.model.encode(
+            [content for _, content, _ in new],
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            device=self.query_encoder.device,
+        ).astype(np.float32)
+        for (doc_id, content, metadata), embedding in zip(new, embeddings):
+            cursor = self.conn.execute(
+                "INSERT INTO docs (doc_id, content, metadata) VALUES (?, ?, ?)",
+                (doc_id, content, json.dumps(metadata)),
+            )
+            self.conn.execute(
+                "INSERT INTO vec_docs (rowid, embedding) VALUES (?, ?)",
+                (cursor.lastrowid, embedding.tobytes()),
+            )
+        self.conn.commit()
+
+    def search(self, query: str, n_results: int):
+        """Return results in the same shape as a ChromaDB query response"""
+        return self.search_embedding(self.embed(query), n_results)
+
+    def search_embedding(self, query_embedding: np.ndarray, n_results: int):
+        """Search with an already-computed query embedding"""
+        rows = self.conn.execute(
+            "SELECT docs.content, docs.metadata, vec_docs.distance "
+            "FROM vec_docs JOIN docs ON docs.rowid = vec_docs.rowid "
+            "WHERE vec_docs.embedding MATCH ? AND k = ? ORDER BY vec_docs.distance",
+            (query_embedding.tobytes(), n_results),
+        ).fetchall()
+        docs = [content for content, _, _ in rows]
+        metas = [json.loads(metadata) for _, metadata, _ in rows]
+        distances = [float(distance) for _, _, distance in rows]
+        return {'documents': [docs], 'metadatas': [metas], 'distances': [distances]}
+
+
+class SemanticCache:
+    """LRU cache for retrieval results, keyed on query meaning rather than text.
+
+    Exact repeats are served from a hash lookup before any embedding happens;
+    near-repeats (paraphrases) are caught by an inner-product search over the
+    cached query embeddings. RAG query streams are heavily skewed towards
+    repeated questions, so hits skip both the embedding model and the index.
+    """
+
+    def __init__(self, capacity: int = 128, similarity_threshold: float = 0.95):
+        self.capacity = capacity
+        self.similarity_threshold = similarity_threshold
+        self.entries = OrderedDict()  # query_hash -> (embedding, results)
+        self.index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        self.row_hashes = []  # parallel to index rows
+
+    @staticmethod
+    def key_for(query: str, n_results: int) -> str:
+        """Exact-match key: SHA-256 of the whitespace/case-normalized query.
+
+        n_results is folded into the key so a hit always has the size the
+        caller asked for.
+        """
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha256(f"{n_results}:{normalized}".encode()).hexdigest()
+
+    def get_exact(self, query_hash: str):
+        """Exact-match fast path; no embedding required"""
+        entry = self.entries.get(query_hash)
+        if entry is None:
+            return None
+        self.entries.move_to_end(query_hash)
+        return entry[2]
+
+    def get_similar(self, query_embedding: np.ndarray, n_results: int):
+        """Similarity path: nearest cached query embedding above the threshold"""
+        if self.index.ntotal == 0:
+            return None
+        scores, indices = self.index.search(query_embedding[None, :], 1)
+        if scores[0, 0] < self.similarity_threshold:
+            return None
+        query_hash = self.row_hashes[indices[0, 0]]
+        entry = self.entries[query_hash]
+        if entry[1] != n_results:
+            return None
+        self.entries.move_to_end(query_hash)
+        return entry[2]
+
+    def put(self, query_hash: str, query_embedding: np.ndarray, n_results: int, results):
+        if query_hash in self.entries:
+            self.entries.move_to_end(query_hash)
+            return
+        self.entries[query_hash] = (query_embedding, n_results, results)
+        self.index.add(query_embedding[None, :])
+        self.row_hashes.append(query_hash)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self._rebuild_index()
+
+    def clear(self):
+        """Drop all entries; called when the corpus changes so stale result
+        sets missing newly added documents cannot be served"""
+        self.entries.clear()
+        self.row_hashes = []
+        self.index.reset()
+
+    def _rebuild_index(self):
+        """Rebuild the small cache index after an eviction"""
+        self.index.reset()
+        self.row_hashes = [h for h in self.entries]
+        embeddings = np.stack([self.entries[h][0] for h in self.row_hashes])
+        self.index.add(embeddings)
+
+
 class PersonalKnowledgeRAG:
-    def __init__(self):
-        self.chroma_client = chromadb.Client()
-        self.collection = self.chroma_client.create_collection(name="knowledge_base")
+    def __init__(self, use_chroma: bool = False, embedding_model: "SentenceTransformer" = None):
+        # Backend preference: FAISS flat index (fastest hot path), then
+        # sqlite-vec (persistent, still in-process), then ChromaDB. The
+        # use_chroma flag forces the ChromaDB path.
+        self.vector_store = None
+        self.semantic_cache = None
+        if SENTENCE_TRANSFORMERS_AVAILABLE and not use_chroma:
+            if FAISS_AVAILABLE:
+                self.vector_store = FAISSVectorStore(model=embedding_model)
+                self.semantic_cache = SemanticCache()
+            elif SQLITE_VEC_AVAILABLE:
+                try:
+                    self.vector_store = SqliteVecStore(model=embedding_model)
+                except (AttributeError, sqlite3.OperationalError):
+                    # AttributeError: Python built without loadable-extension
+                    # support (no Connection.enable_load_extension);
+                    # OperationalError: the vec0 extension failed to load
+                    self.vector_store = None
+        if self.vector_store is None:
+            # Persistent client so embeddings survive Streamlit reruns instead
+            # of being regenerated on every widget interaction
+            self.chroma_client = _chromadb().PersistentClient(path=".chromadb")
+            self.collection = self.chroma_client.get_or_create_collection(
+                name="knowledge_base",
+                metadata=CHROMA_HNSW_METADATA
+            )
+        # Ids already inserted this process: lets add_document return before
+        # touching the store (or the embedding model) on re-adds
+        self._seen_ids = set()
         self.user_profiles = {}
-        self.interaction_history = []
+        # Streaming stats: O(1) reads for the UI, no history scans
+        self.interaction_counts = Counter()
+        self.total_interactions = 0
+        # Durable interaction log: buffer in memory, flush in batches so the
+        # hot path pays one write syscall per HISTORY_FLUSH_EVERY events
+        self._history_buf = []
+        self._history_path = "history.jsonl"
+        self._history_fh = None
+        # Sessions with fewer than HISTORY_FLUSH_EVERY interactions would
+        # otherwise never hit the size trigger; flush whatever is buffered
+        # when the interpreter exits
+        atexit.register(self._flush_history)
 
     def add_document(self, content: str, metadata: Dict[str, Any]):
         """Add document to knowledge base with metadata"""
-        doc_id = hashlib.md5(content.encode()).hexdigest()
-        self.collection.add(
-            documents=[content],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
+        doc_id = content_id(content)
+        if doc_id in self._seen_ids:
+            return doc_id
+        if self.vector_store is not None:
+            self.vector_store.add(doc_id, content, metadata)
+        else:
+            # Skip re-adds so persisted documents are not re-embedded
+            if not self.collection.get(ids=[doc_id])['ids']:
+                self.collection.add(
+                    documents=[content],
+                    metadatas=[metadata],
+                    ids=[doc_id]
+                )
+        self._seen_ids.add(doc_id)
+        self._invalidate_cache()
         return doc_id
 
+    def add_documents(self, contents: List[str], metadatas: List[Dict[str, Any]]):
+        """Add documents in one batch: a single embedding forward pass and one
+        index/collection insert instead of per-document calls"""
+        doc_ids = [content_id(content) for content in contents]
+        fresh = [
+            (doc_id, content, metadata)
+            for doc_id, content, metadata in zip(doc_ids, contents, metadatas)
+            if doc_id not in self._seen_ids
+        ]
+        if not fresh:
+            return doc_ids
+        fresh_ids = [doc_id for doc_id, _, _ in fresh]
+        if self.vector_store is not None:
+            self.vector_store.add_batch(
+                fresh_ids,
+                [content for _, content, _ in fresh],
+                [metadata for _, _, metadata in fresh]
+            )
+        else:
+            existing = set(self.collection.get(ids=fresh_ids)['ids'])
+            new = [entry for entry in fresh if entry[0] not in existing]
+            if new:
+                self.collection.add(
+                    documents=[content for _, content, _ in new],
+                    metadatas=[metadata for _, _, metadata in new],
+                    ids=[doc_id for doc_id, _, _ in new]
+                )
+        self._seen_ids.update(fresh_ids)
+        self._invalidate_cache()
+        return doc_ids
+
     def create_user_profile(self, user_id: str, preferences: Dict[str, Any]):
         """Create personalized user profile"""
         self.user_profiles[user_id] = {
@@ -38,36 +712,71 @@ class PersonalKnowledgeRAG:
             'expertise_level': preferences.get('level', 'intermediate')
         }
 
+    def _flush_history(self):
+        """Write buffered interactions with a single writelines call"""
+        if not self._history_buf:
+            return
+        if self._history_fh is None:
+            self._history_fh = open(self._history_path, "ab", buffering=1 << 20)
+        self._history_fh.writelines(self._history_buf)
+        self._history_fh.flush()
+        self._history_buf.clear()
+
     def update_user_interaction(self, user_id: str, query: str, response: str):
         """Track user interactions for personalization"""
         if user_id in self.user_profiles:
             self.user_profiles[user_id]['interaction_count'] += 1
             interaction = {
                 'user_id': user_id,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.now(),
                 'query': query,
                 'response': response
             }
-            self.interaction_history.append(interaction)
+            self.interaction_counts[user_id] += 1
+            self.total_interactions += 1
+            self._history_buf.append(serialize_interaction(interaction))
+            if len(self._history_buf) >= HISTORY_FLUSH_EVERY:
+                self._flush_history()
+
+    def _invalidate_cache(self):
+        """Reset the semantic cache after a corpus change; inserts are rare
+        and a stale hit would silently exclude the new documents"""
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def _enhance_query(self, query: str, expertise_level: str) -> str:
+        """Modify query based on user expertise"""
+        prefix, suffix = QUERY_WRAP.get(expertise_level, ('', ''))
+        return prefix + query + suffix
 
     def personalized_retrieval(self, query: str, user_id: str, n_results: int = 3):
         """Retrieve documents with personalization based on user profile"""
         user_profile = self.user_profiles.get(user_id, {})
         expertise_level = user_profile.get('expertise_level', 'intermediate')
-        
-        # Modify query based on user expertise
-        if expertise_level == 'beginner':
-            enhanced_query = f"basic introduction {query} simple explanation"
-        elif expertise_level == 'expert':
-            enhanced_query = f"advanced technical {query} detailed analysis"
+        enhanced_query = self._enhance_query(query, expertise_level)
+
+        # Retrieve relevant documents, checking the semantic cache first.
+        # The cache key includes the expertise enhancement, so users at
+        # different levels never share cached results.
+        if self.vector_store is not None:
+            if self.semantic_cache is not None:
+                query_hash = SemanticCache.key_for(enhanced_query, n_results)
+                cached = self.semantic_cache.get_exact(query_hash)
+                if cached is not None:
+                    return cached
+                query_embedding = self.vector_store.embed(enhanced_query)
+                cached = self.semantic_cache.get_similar(query_embedding, n_results)
+                if cached is not None:
+                    return cached
+                results = self.vector_store.search_embedding(query_embedding, n_results)
+                self.semantic_cache.put(query_hash, query_embedding, n_results, results)
+            else:
+                results = self.vector_store.search(enhanced_query, n_results)
         else:
-            enhanced_query = query
-        
-        # Retrieve relevant documents
-        results = self.collection.query(
-            query_texts=[enhanced_query],
-            n_results=n_results
-        )
+            results = self.collection.query(
+                query_texts=[enhanced_query],
+                n_results=n_results
+            )
         return results
 
     def generate_personalized_response(self, query: str, user_id: str, retrieved_docs: List[str]):
@@ -78,37 +787,15 @@ class PersonalKnowledgeRAG:
         
         # Create context from retrieved documents
         context = "\n\n".join(retrieved_docs)
-        
-        # Personalized prompt based on user profile
-        style_instructions = {
-            'professional': "Provide a professional, structured response",
-            'casual': "Use a friendly, conversational tone",
-            'technical': "Focus on technical details and implementation",
-            'creative': "Use creative examples and analogies"
-        }
-        
-        level_instructions = {
-            'beginner': "Explain concepts simply with basic examples",
-            'intermediate': "Provide balanced detail with practical examples",
-            'expert': "Include advanced concepts and technical depth"
-        }
-        
-        prompt = f"""
-Based on the following context, answer the user's question.
-
-Context:
-{context}
 
-User Question: {query}
-
-Instructions:
-- {style_instructions.get(response_style, 'Provide a clear response')}
-- {level_instructions.get(expertise_level, 'Use appropriate detail level')}
-- Make the response personally relevant and actionable
+        # Personalized prompt from the pre-built template and constant lookups
+        prompt = PROMPT_TEMPLATE.format_map({
+            'context': context,
+            'query': query,
+            'style': STYLE_INSTRUCTIONS.get(response_style, 'Provide a clear response'),
+            'level': LEVEL_INSTRUCTIONS.get(expertise_level, 'Use appropriate detail level')
+        })
 
-Response:
-"""
-        
         # Simulate AI response (in real implementation, use OpenAI API)
         response = f"Based on your {expertise_level} level and {response_style} preference, here's a personalized answer to '{query}': [Generated response using retrieved context and user preferences]"
         return response
@@ -129,6 +816,19 @@ Response:
         }
 
 # Streamlit Web Interface
+@st.cache_resource
+def load_embedding_model():
+    """Load the embedding model once per process; reruns reuse the weights"""
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+@st.cache_resource
+def load_rag_system():
+    """Build the RAG system once per process instead of on every rerun"""
+    model = load_embedding_model() if SENTENCE_TRANSFORMERS_AVAILABLE else None
+    return PersonalKnowledgeRAG(embedding_model=model)
+
+
 def main():
     st.set_page_config(
         page_title="PersonalKnowledgeRAG",
@@ -137,11 +837,11 @@ def main():
     )
     
     st.title("🧠 PersonalKnowledgeRAG")
-    st.subtitle("AI-Powered Personalized Knowledge Assistant")
+    st.caption("AI-Powered Personalized Knowledge Assistant")
     
-    # Initialize the RAG system
+    # Initialize the RAG system (cached across reruns and sessions)
     if 'rag_system' not in st.session_state:
-        st.session_state.rag_system = PersonalKnowledgeRAG()
+        st.session_state.rag_system = load_rag_system()
     
     # Add sample documents
     sample_docs = [
@@ -159,8 +859,13 @@ def main():
         }
     ]
     
-    for doc in sample_docs:
-        st.session_state.rag_system.add_document(doc['content'], doc['metadata'])
+    # Seed once per session; reruns skip the insertion entirely
+    if not st.session_state.get('kb_seeded'):
+        st.session_state.rag_system.add_documents(
+            [doc['content'] for doc in sample_docs],
+            [doc['metadata'] for doc in sample_docs]
+        )
+        st.session_state.kb_seeded = True
     
     # Sidebar for user profile setup
     st.sidebar.header("User Profile")
@@ -211,7 +916,7 @@ def main():
             st.write(f"**Expertise:** {profile.get('expertise_level', 'Not set')}")
             st.write(f"**Style:** {profile.get('response_style', 'Not set')}")
         st.write(f"**Total Users:** {len(st.session_state.rag_system.user_profiles)}")
-        st.write(f"**Total Interactions:** {len(st.session_state.rag_system.interaction_history)}")
+        st.write(f"**Total Interactions:** {st.session_state.rag_system.total_interactions}")
     
     # Document management
     st.header("Knowledge Base Management")